@@ -20,4 +20,7 @@ fi
 
 # Start server
 echo "Starting server..."
-gunicorn ecommerce_backend.wsgi:application --bind 0.0.0.0:8000 --access-logfile - --reload
\ No newline at end of file
+# One process, since the order queue lives in it; threads let long-polls on
+# /api/orders/changes wait without holding up other requests
+gunicorn ecommerce_backend.wsgi:application --bind 0.0.0.0:8000 --access-logfile - --reload \
+    --worker-class gthread --threads "${GUNICORN_THREADS:-32}"
\ No newline at end of file
@@ -50,6 +50,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "orders.middleware.ReplicaPinningMiddleware",
 ]
 
 ROOT_URLCONF = "ecommerce_backend.urls"
@@ -84,9 +85,36 @@ DATABASES = {
         "PASSWORD": os.getenv('POSTGRES_PASSWORD', 'postgres'),
         "HOST": os.getenv('POSTGRES_HOST', 'db'),
         "PORT": os.getenv('POSTGRES_PORT', '5432'),
+        # Request and scatter threads reuse their connections instead of reconnecting per query
+        "CONN_MAX_AGE": int(os.getenv('POSTGRES_CONN_MAX_AGE', 60)),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Order sharding
+# Order rows are spread across ORDER_SHARDS by a hash of user_id; reads may go
+# to any database listed for the shard in ORDER_SHARD_REPLICAS. Clients that
+# just wrote read from the primaries for ORDER_REPLICA_PIN_SECONDS.
+
+DATABASE_ROUTERS = ["orders.db_router.OrderShardRouter"]
+
+ORDER_SHARDS = ["default"]
+
+ORDER_SHARD_REPLICAS = {}
+
+ORDER_REPLICA_PIN_SECONDS = int(os.getenv('ORDER_REPLICA_PIN_SECONDS', 15))
+
+# Size of the shared thread pool that queries the shards in parallel
+ORDER_SCATTER_THREADS = int(os.getenv('ORDER_SCATTER_THREADS', 16))
+
+# Order queue journal
+# When set, enqueues and completions are journaled to this local file and the
+# queue backlog is rebuilt from it on startup. Each process needs its own path.
+
+ORDER_JOURNAL_PATH = os.getenv('ORDER_JOURNAL_PATH') or None
+
+ORDER_JOURNAL_SYNC = os.getenv('ORDER_JOURNAL_SYNC', 'group')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -0,0 +1,38 @@
+"""
+Local multi-database settings: three SQLite order shards, each with a replica.
+
+The replicas open the same file as their primary, which stands in for
+streaming replication. Run the sharded integration tests against them with:
+    python manage.py test orders.tests.test_sharding --settings=ecommerce_backend.settings_sharded
+
+The rest of the suite queries Order without choosing a shard and assumes a
+single database, so run it with the default settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+SHARD_COUNT = 3
+
+DATABASES = {}
+ORDER_SHARDS = []
+ORDER_SHARD_REPLICAS = {}
+
+for index in range(SHARD_COUNT):
+    shard = "default" if index == 0 else f"shard_{index}"
+    replica = f"{shard}_replica"
+    name = BASE_DIR / f"orders_shard_{index}.sqlite3"
+    DATABASES[shard] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": name,
+        # File-backed test databases: the queue worker and scatter threads
+        # use their own connections, which shared-cache memory databases lock out
+        "TEST": {"NAME": BASE_DIR / f"test_orders_shard_{index}.sqlite3"},
+        "OPTIONS": {"timeout": 20},
+    }
+    DATABASES[replica] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": name,
+        "TEST": {"MIRROR": shard},
+    }
+    ORDER_SHARDS.append(shard)
+    ORDER_SHARD_REPLICAS[shard] = [replica]
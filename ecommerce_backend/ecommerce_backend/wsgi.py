@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ecommerce_backend.settings")
 
 application = get_wsgi_application()
+
+if settings.ORDER_JOURNAL_PATH:
+    # Replay the journal as the server starts, rather than on the first request
+    from orders.core.queue_manager import OrderQueue
+
+    OrderQueue()
@@ -1,6 +1,8 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Order
+from .models import DeadLetterOrder, Order, OrderStatusChange
 
 admin.site.register(Order)
+admin.site.register(DeadLetterOrder)
+admin.site.register(OrderStatusChange)
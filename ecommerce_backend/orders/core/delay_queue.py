@@ -0,0 +1,67 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class DelayQueue:
+    """Timer heap that holds items until their delay expires, then hands them to `release`.
+
+    A single timer thread waits for the earliest deadline, so callers scheduling
+    delayed work never block and no worker has to sleep on it.
+    """
+
+    def __init__(self, release):
+        self.release = release
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._is_running = False
+
+    def put(self, item, delay):
+        due_at = time.monotonic() + max(delay, 0)
+        with self._condition:
+            heapq.heappush(self._heap, (due_at, next(self._counter), item))
+            self._condition.notify()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._heap)
+
+    def start(self):
+        with self._condition:
+            if self._is_running:
+                return
+            self._is_running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._is_running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._is_running:
+                    return
+                due = self._pop_due()
+                if not due:
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(timeout)
+                    continue
+            for item in due:
+                self.release(item)
+
+    def _pop_due(self):
+        now = time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
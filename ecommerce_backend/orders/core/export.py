@@ -0,0 +1,142 @@
+import csv
+import heapq
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from ..models import Order
+from .sharding import get_shards, read_alias
+
+EXPORT_FIELDS = [
+    'order_id',
+    'user_id',
+    'item_ids',
+    'total_amount',
+    'status',
+    'created_at',
+    'updated_at',
+    'processing_started_at',
+    'processing_completed_at',
+]
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+
+def iter_orders(start, end, chunk_size=CHUNK_SIZE):
+    # Each shard is already sorted by created_at, so a k-way merge keeps the output sorted
+    created_at = EXPORT_FIELDS.index('created_at')
+    shard_rows = [_iter_shard(read_alias(shard), start, end, chunk_size) for shard in get_shards()]
+    return heapq.merge(*shard_rows, key=lambda row: row[created_at])
+
+
+def _iter_shard(alias, start, end, chunk_size):
+    # iterator() reads through a server-side cursor on PostgreSQL. Outside a transaction
+    # Django declares it WITH HOLD, which makes PostgreSQL materialise the whole result
+    # before the first row; inside one the rows are fetched as they are read.
+    with transaction.atomic(using=alias):
+        yield from Order.objects.using(alias).filter(
+            created_at__gte=start,
+            created_at__lt=end
+        ).order_by('created_at').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+class ExportJSONEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder cuts datetimes to milliseconds; exports keep them whole
+    def default(self, o):
+        if isinstance(o, datetime):
+            return _timestamp(o)
+        return super().default(o)
+
+
+def iter_ndjson(rows):
+    encoder = ExportJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+
+def iter_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        if buffer.tell() >= BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_export(start, end, export_format):
+    lines = iter_ndjson if export_format == 'ndjson' else iter_csv
+    return _buffered(lines(iter_orders(start, end)))
+
+
+def iter_gzip(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def copy_orders_csv(start, end, output):
+    """Write the CSV export with PostgreSQL's COPY ... TO STDOUT instead of row-by-row.
+
+    Shards are copied one after another, so rows are only sorted within each shard.
+    """
+    table = Order._meta.db_table
+    columns = ', '.join(_copy_column(name) for name in EXPORT_FIELDS)
+    for position, shard in enumerate(get_shards()):
+        header = 'true' if position == 0 else 'false'
+        with connections[read_alias(shard)].cursor() as cursor:
+            query = cursor.mogrify(
+                f"COPY (SELECT {columns} FROM {table} "
+                f"WHERE {table}.created_at >= %s AND {table}.created_at < %s ORDER BY {table}.created_at) "
+                f"TO STDOUT WITH (FORMAT csv, HEADER {header})",
+                [start, end]
+            )
+            cursor.copy_expert(query, output)
+
+
+def _copy_column(name):
+    # Same timestamp format as _csv_value, so both entry points write identical CSV.
+    # The text column keeps the field's name, hence the qualified names in WHERE and ORDER BY.
+    if Order._meta.get_field(name).get_internal_type() == 'DateTimeField':
+        return f"""to_char({name} AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"+00:00"') AS {name}"""
+    return name
+
+
+def _buffered(lines):
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return _timestamp(value)
+    return value
+
+
+def _timestamp(value):
+    return value.astimezone(timezone.utc).isoformat(timespec='microseconds')
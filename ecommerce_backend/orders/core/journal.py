@@ -0,0 +1,189 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from .sharding import get_shards
+
+# op, shard index, order pk, enqueue timestamp, crc32 of the preceding fields
+RECORD = struct.Struct('<BHqdI')
+ENQUEUE = 1
+COMPLETE = 2
+GROW_BYTES = 1 << 20
+
+
+class JournalLocked(Exception):
+    pass
+
+
+class OrderJournal:
+    """Append-only, memory-mapped write-ahead log of queue enqueues and completions.
+
+    Records are fixed-size and checksummed, so a torn write at the tail is
+    detected and dropped on replay. A background thread msyncs the mapping.
+    With `sync='group'` each enqueue waits for the next sync, which covers
+    every record appended since the previous one; with `sync='async'` nobody
+    waits and the mapping is synced at most every `sync_interval` seconds.
+    Once dead records outnumber live ones the file is rewritten with only the
+    live enqueues.
+    """
+
+    def __init__(self, path, sync='group', sync_interval=0.005, compact_min_records=100000):
+        self.path = path
+        self.sync = sync
+        self.sync_interval = sync_interval
+        self.compact_min_records = compact_min_records
+        self.live = {}
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._pending = threading.Event()
+        self._appended_seq = 0
+        self._synced_seq = 0
+        self._is_running = True
+
+        self._lock_file = open(f'{path}.lock', 'a')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise JournalLocked(f"{path} is in use by another process")
+
+        self._open()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def replay(self):
+        """Return (shard, pk, enqueued_at) for every order enqueued but not completed, oldest first."""
+        shards = get_shards()
+        with self._lock:
+            live = sorted(self.live.items(), key=lambda item: item[1])
+        return [
+            (shards[shard_index], pk, enqueued_at)
+            for (shard_index, pk), enqueued_at in live
+            if shard_index < len(shards)
+        ]
+
+    def record_enqueue(self, shard, pk, enqueued_at):
+        seq = self._append(ENQUEUE, shard, pk, enqueued_at)
+        if self.sync == 'group':
+            self._wait_for_sync(seq)
+
+    def record_complete(self, shard, pk):
+        self._append(COMPLETE, shard, pk, 0.0)
+
+    def close(self):
+        self._is_running = False
+        self._pending.set()
+        self._thread.join()
+        self._sync()
+        with self._lock, self._io_lock:
+            self._map.close()
+            self._file.close()
+        self._lock_file.close()
+
+    def _open(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._file = os.fdopen(fd, 'r+b')
+        size = os.fstat(fd).st_size
+        if size < GROW_BYTES:
+            self._file.truncate(GROW_BYTES)
+            size = GROW_BYTES
+        self._map = mmap.mmap(fd, size)
+        self._offset, self._records = self._scan()
+
+    def _scan(self):
+        offset = records = 0
+        self.live = {}
+        while offset + RECORD.size <= len(self._map) and self._map[offset]:
+            op, shard_index, pk, enqueued_at, crc = RECORD.unpack_from(self._map, offset)
+            if crc != zlib.crc32(self._map[offset:offset + RECORD.size - 4]):
+                # Torn write from a crash; everything after it is discarded
+                self._map[offset:] = bytes(len(self._map) - offset)
+                break
+            if op == ENQUEUE:
+                self.live[(shard_index, pk)] = enqueued_at
+            else:
+                self.live.pop((shard_index, pk), None)
+            offset += RECORD.size
+            records += 1
+        return offset, records
+
+    def _append(self, op, shard, pk, enqueued_at):
+        shard_index = get_shards().index(shard)
+        fields = RECORD.pack(op, shard_index, pk, enqueued_at, 0)[:-4]
+        record = fields + struct.pack('<I', zlib.crc32(fields))
+        with self._lock:
+            if self._offset + RECORD.size > len(self._map):
+                self._grow()
+            self._map[self._offset:self._offset + RECORD.size] = record
+            self._offset += RECORD.size
+            self._records += 1
+            if op == ENQUEUE:
+                self.live[(shard_index, pk)] = enqueued_at
+            else:
+                self.live.pop((shard_index, pk), None)
+            self._appended_seq += 1
+            seq = self._appended_seq
+        self._pending.set()
+        return seq
+
+    def _grow(self):
+        # Called with _lock held; _io_lock keeps a sync from using the old mapping
+        with self._io_lock:
+            size = len(self._map) + GROW_BYTES
+            self._map.flush()
+            self._map.close()
+            self._file.truncate(size)
+            os.fsync(self._file.fileno())
+            self._map = mmap.mmap(self._file.fileno(), size)
+
+    def _wait_for_sync(self, seq):
+        with self._synced:
+            while self._synced_seq < seq:
+                self._synced.wait()
+
+    def _run(self):
+        while self._is_running:
+            self._pending.wait()
+            self._pending.clear()
+            # Everything appended while the previous sync ran goes out in this one
+            self._sync()
+            if self._records >= self.compact_min_records and len(self.live) * 2 < self._records:
+                self._compact()
+            if self.sync != 'group':
+                time.sleep(self.sync_interval)
+
+    def _sync(self):
+        with self._lock:
+            seq = self._appended_seq
+        with self._io_lock:
+            self._map.flush()
+        with self._synced:
+            self._synced_seq = max(self._synced_seq, seq)
+            self._synced.notify_all()
+
+    def _compact(self):
+        with self._lock, self._io_lock:
+            live = sorted(self.live.items(), key=lambda item: item[1])
+            size = max(GROW_BYTES, -(-len(live) * RECORD.size // GROW_BYTES) * GROW_BYTES)
+            compacted_path = f'{self.path}.compact'
+            with open(compacted_path, 'wb') as compacted:
+                for (shard_index, pk), enqueued_at in live:
+                    fields = RECORD.pack(ENQUEUE, shard_index, pk, enqueued_at, 0)[:-4]
+                    compacted.write(fields + struct.pack('<I', zlib.crc32(fields)))
+                compacted.truncate(size)
+                compacted.flush()
+                os.fsync(compacted.fileno())
+            os.replace(compacted_path, self.path)
+            directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
+            self._map.close()
+            self._file.close()
+            self._open()
@@ -0,0 +1,152 @@
+import queue
+import threading
+import time
+from django.db import connections
+
+
+class Stage:
+    """One processing step with its own worker pool and bounded inbox.
+
+    A full inbox blocks the upstream stage, so a slow stage pushes back on the
+    ones before it instead of letting work pile up in memory.
+    """
+
+    def __init__(self, name, handler, workers=1, queue_size=100):
+        self.name = name
+        self.handler = handler
+        self.position = 0
+        self.workers = workers
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.next_stage = None
+        self.threads = []
+        self.is_running = False
+        self.stats_lock = threading.Lock()
+        self.started_at = None
+        self.busy = 0
+        self.processed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.total_service = 0.0
+
+    def put(self, order):
+        # Blocks while the inbox is full
+        self.inbox.put((order, time.monotonic()))
+
+    def start(self, on_complete, on_error):
+        if self.is_running:
+            return
+        self.is_running = True
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        self.threads = [
+            threading.Thread(target=self._work, args=(on_complete, on_error), daemon=True)
+            for _ in range(self.workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.is_running = False
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def get_stats(self):
+        with self.stats_lock:
+            elapsed = time.monotonic() - self.started_at if self.started_at else 0
+            return {
+                'name': self.name,
+                'workers': self.workers,
+                'queue_depth': self.inbox.qsize(),
+                'queue_size': self.inbox.maxsize,
+                'busy_workers': self.busy,
+                'processed': self.processed,
+                'failed': self.failed,
+                'throughput_per_second': round(self.processed / elapsed, 3) if elapsed else 0,
+                'average_wait_seconds': self._average(self.total_wait),
+                'average_service_seconds': self._average(self.total_service),
+                'utilization': round(self.total_service / (elapsed * self.workers), 3) if elapsed else 0,
+            }
+
+    def _average(self, total):
+        handled = self.processed + self.failed
+        return round(total / handled, 3) if handled else None
+
+    def _work(self, on_complete, on_error):
+        while self.is_running:
+            try:
+                order, enqueued_at = self.inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            started_at = time.monotonic()
+            with self.stats_lock:
+                self.busy += 1
+                self.total_wait += started_at - enqueued_at
+            try:
+                self.handler(order)
+            except Exception as e:
+                self._finish(started_at, failed=True)
+                # The position tells a retry where to resume, so earlier stages do not run twice
+                on_error(order, e, self.position)
+            else:
+                self._finish(started_at, failed=False)
+                if self.next_stage:
+                    self.next_stage.put(order)
+                else:
+                    on_complete(order)
+            finally:
+                # Close the database connections after each order
+                connections.close_all()
+
+    def _finish(self, started_at, failed):
+        with self.stats_lock:
+            self.busy -= 1
+            self.total_service += time.monotonic() - started_at
+            if failed:
+                self.failed += 1
+            else:
+                self.processed += 1
+
+
+class Pipeline:
+    """Chain of stages; stages work on different orders at the same time."""
+
+    def __init__(self, stages, on_complete, on_error):
+        self.stages = stages
+        self.on_complete = on_complete
+        self.on_error = on_error
+        for position, stage in enumerate(stages):
+            stage.position = position
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next_stage = next_stage
+
+    def submit(self, order, start=0):
+        # Starting past the last stage means only completion is left
+        if start >= len(self.stages):
+            self.on_complete(order)
+        else:
+            self.stages[start].put(order)
+
+    def get_stage(self, name):
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(name)
+
+    def start(self):
+        for stage in self.stages:
+            stage.start(self.on_complete, self.on_error)
+
+    def stop(self):
+        # Front to back, so a stage handing an order downstream never waits on a stopped stage
+        for stage in self.stages:
+            stage.stop()
+
+    def get_stats(self):
+        stats = [stage.get_stats() for stage in self.stages]
+        busiest = max(stats, key=lambda stage: stage['utilization'])
+        return {
+            'stages': stats,
+            'bottleneck': busiest['name'] if busiest['utilization'] else None,
+        }
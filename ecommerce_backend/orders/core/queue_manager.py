@@ -2,9 +2,38 @@ import queue
 import threading
 import time
 from datetime import datetime
-from django.db import IntegrityError, connection, transaction
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
 from django.utils import timezone
-from ..models import Order, OrderStatus
+from ..models import DeadLetterOrder, Order, OrderStatus
+from .delay_queue import DelayQueue
+from .journal import JournalLocked, OrderJournal
+from .pipeline import Pipeline
+from .rolling_metrics import RollingMetrics
+from .sharding import shard_for_instance
+from .stages import InvalidOrder, build_stages
+
+# Advisory lock key that serialises writes to the status change log on each shard
+CHANGE_LOG_LOCK_ID = 7210340
+
+class QueueEntry:
+    """What the queue holds for an order: where to load it from, not the model instance.
+
+    `stage` is the pipeline stage a retry resumes at, so stages that already
+    succeeded, such as payment, are not run again.
+    """
+
+    __slots__ = ('pk', 'shard', 'enqueued_at', 'stage')
+
+    def __init__(self, pk, shard, enqueued_at, stage=0):
+        self.pk = pk
+        self.shard = shard
+        self.enqueued_at = enqueued_at
+        self.stage = stage
+
+    @classmethod
+    def for_order(cls, order, stage=0):
+        return cls(order.pk, shard_for_instance(order), time.time(), stage)
 
 class OrderQueue:
     _instance = None
@@ -15,52 +44,268 @@ class OrderQueue:
             if cls._instance is None:
                 cls._instance = super(OrderQueue, cls).__new__(cls)
                 cls._instance.queue = queue.Queue()
+                cls._instance.retry_queue = DelayQueue(cls._instance.queue.put)
                 cls._instance.processing_thread = None
                 cls._instance.is_running = False
+                cls._instance.max_attempts = getattr(settings, 'ORDER_QUEUE_MAX_ATTEMPTS', 5)
+                cls._instance.retry_base_delay = getattr(settings, 'ORDER_QUEUE_RETRY_BASE_DELAY', 1.0)
+                cls._instance.retry_max_delay = getattr(settings, 'ORDER_QUEUE_RETRY_MAX_DELAY', 60.0)
+                cls._instance.claim_batch_size = getattr(settings, 'ORDER_QUEUE_CLAIM_BATCH_SIZE', 100)
+                cls._instance.attempts = {}
+                cls._instance.stats_lock = threading.Lock()
+                cls._instance.retries_scheduled = 0
+                cls._instance.orders_dead_lettered = 0
+                cls._instance.rolling_metrics = RollingMetrics()
+                cls._instance.status_changed = threading.Condition()
+                cls._instance.pipeline = Pipeline(
+                    build_stages(),
+                    cls._instance._complete_order,
+                    cls._instance._fail_order
+                )
+                cls._instance.journal = cls._instance._open_journal()
+                if cls._instance.queue.qsize():
+                    # The backlog replayed from the journal drains without waiting for a request
+                    cls._instance.start_processing()
             return cls._instance
 
     def start_processing(self):
         if not self.is_running:
             self.is_running = True
+            self.retry_queue.start()
+            self.pipeline.start()
             self.processing_thread = threading.Thread(target=self._process_orders)
             self.processing_thread.daemon = True
             self.processing_thread.start()
 
     def add_order(self, order):
-        self.queue.put(order)
+        entry = QueueEntry.for_order(order)
+        if self.journal:
+            # Write-ahead: the entry is on disk before a worker can claim it
+            self.journal.record_enqueue(entry.shard, entry.pk, entry.enqueued_at)
+        self.queue.put(entry)
+
+    def get_stats(self):
+        with self.stats_lock:
+            return {
+                'retries_scheduled': self.retries_scheduled,
+                'retries_pending': len(self.retry_queue),
+                'orders_dead_lettered': self.orders_dead_lettered,
+            }
+
+    def wait_for_status_change(self, timeout):
+        with self.status_changed:
+            self.status_changed.wait(timeout)
+
+    def _open_journal(self):
+        path = getattr(settings, 'ORDER_JOURNAL_PATH', None)
+        if not path:
+            return None
+        try:
+            journal = OrderJournal(
+                path,
+                sync=getattr(settings, 'ORDER_JOURNAL_SYNC', 'group'),
+                sync_interval=getattr(settings, 'ORDER_JOURNAL_SYNC_INTERVAL', 0.005),
+                compact_min_records=getattr(settings, 'ORDER_JOURNAL_COMPACT_RECORDS', 100000)
+            )
+        except JournalLocked as e:
+            print(f"Order journal disabled: {e}")
+            return None
+
+        # Rebuild the backlog left by the previous process without scanning the orders table
+        for shard, pk, enqueued_at in journal.replay():
+            self.queue.put(QueueEntry(pk, shard, enqueued_at))
+        return journal
+
+    def _finish(self, shard, pk):
+        # The order has left the queue for good; a retry is not a finish
+        if self.journal:
+            self.journal.record_complete(shard, pk)
 
     def _process_orders(self):
+        # Claims a batch of entries, loads their orders, marks them as processing and
+        # hands them to the pipeline, whose stages do the work
         while self.is_running:
             try:
-                order = self.queue.get(timeout=1)
-                with transaction.atomic():
-                    order.status = OrderStatus.PROCESSING
-                    order.processing_started_at = timezone.now()
-                    order.save()
-                    # Force a commit by exiting the transaction block
-                
-                # Simulate processing time
-                time.sleep(1)
-
-                order.status = OrderStatus.COMPLETED
-                order.processing_completed_at = timezone.now()
-                order.save()
-                self.queue.task_done()
+                entries = [self.queue.get(timeout=1)]
             except queue.Empty:
                 continue
-            except IntegrityError as e:
-                if 'unique constraint' in str(e).lower():
-                    print(f"Duplicate order detected: {e}")
-                    self.queue.task_done()
-                else:
-                    print(f"Database integrity error: {e}")
-            except Exception as e:
-                print(f"Error processing order: {e}")
+            while len(entries) < self.claim_batch_size:
+                try:
+                    entries.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._dispatch(entries)
             finally:
-                # Close the database connection after each iteration
-                connection.close()
+                # Close the database connections after each iteration
+                connections.close_all()
+
+    def _dispatch(self, entries):
+        try:
+            orders = self._load_orders(entries)
+        except Exception as e:
+            print(f"Error loading orders: {e}")
+            for entry in entries:
+                self._handle_failure(entry, e)
+                self.queue.task_done()
+            return
+
+        for entry in entries:
+            order = orders.get((entry.shard, entry.pk))
+            if order is None:
+                print(f"Queued order {entry.pk} no longer exists in {entry.shard}")
+                self._finish(entry.shard, entry.pk)
+                self.queue.task_done()
+                continue
+            if order.status in (OrderStatus.COMPLETED, OrderStatus.FAILED):
+                # A crash between the final status commit and its journal record replays
+                # the entry; running the order again would repeat its payment
+                print(f"Queued order {order.order_id} is already {order.status}")
+                self._finish(entry.shard, entry.pk)
+                self.queue.task_done()
+                continue
+            # A retried order is still PROCESSING: there is no transition to log, and
+            # processing_started_at keeps the time of the first attempt
+            if order.status != OrderStatus.PROCESSING:
+                try:
+                    self._change_status(order, OrderStatus.PROCESSING, processing_started_at=timezone.now())
+                except Exception as e:
+                    self._fail_order(order, e)
+                    continue
+            self.pipeline.submit(order, entry.stage)
+
+    def _load_orders(self, entries):
+        pks_by_shard = {}
+        for entry in entries:
+            pks_by_shard.setdefault(entry.shard, []).append(entry.pk)
+
+        # One IN query per shard for the whole batch
+        orders = {}
+        for shard, pks in pks_by_shard.items():
+            for pk, order in Order.objects.using(shard).in_bulk(pks).items():
+                orders[(shard, pk)] = order
+        return orders
+
+    def _complete_order(self, order):
+        try:
+            self._change_status(order, OrderStatus.COMPLETED, processing_completed_at=timezone.now())
+        except Exception as e:
+            # Every stage has succeeded, so a retry only repeats the status write
+            self._fail_order(order, e, len(self.pipeline.stages))
+            return
+
+        with self.stats_lock:
+            self.attempts.pop((shard_for_instance(order), order.pk), None)
+        self._finish(shard_for_instance(order), order.pk)
+        self.rolling_metrics.record_completed(
+            (order.processing_completed_at - order.processing_started_at).total_seconds(),
+            (order.processing_completed_at - order.created_at).total_seconds(),
+        )
+        self.queue.task_done()
+
+    def _fail_order(self, order, error, stage=0):
+        if isinstance(error, IntegrityError):
+            if 'unique constraint' in str(error).lower():
+                print(f"Duplicate order detected: {error}")
+                self._finish(shard_for_instance(order), order.pk)
+            else:
+                print(f"Database integrity error: {error}")
+                self._handle_failure(QueueEntry.for_order(order, stage), error, order)
+        else:
+            print(f"Error processing order {order.order_id}: {error}")
+            self._handle_failure(QueueEntry.for_order(order, stage), error, order)
+        self.queue.task_done()
+
+    def _change_status(self, order, status, **fields):
+        # The transition is logged in the same transaction as the status update
+        from_status = order.status
+        shard = shard_for_instance(order)
+        try:
+            with transaction.atomic(using=shard):
+                self._lock_change_log(shard)
+                order.status = status
+                for name, value in fields.items():
+                    setattr(order, name, value)
+                order.save()
+                order.status_changes.create(from_status=from_status, to_status=status)
+                transaction.on_commit(self._notify_status_changed, using=shard)
+        except Exception:
+            order.status = from_status
+            raise
+
+    def _lock_change_log(self, shard):
+        # Change ids must become visible in id order, or a reader whose cursor has moved
+        # past an id that is still uncommitted would never see it. Holding a transaction
+        # lock from before the insert until commit makes writers on a shard take turns.
+        # SQLite already allows only one writing transaction at a time.
+        connection = connections[shard]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CHANGE_LOG_LOCK_ID])
+
+    def _notify_status_changed(self):
+        with self.status_changed:
+            self.status_changed.notify_all()
+
+    def _handle_failure(self, entry, error, order=None):
+        # An invalid order fails the same way every time, so it is not retried
+        retry = not isinstance(error, InvalidOrder)
+        key = (entry.shard, entry.pk)
+        with self.stats_lock:
+            attempts = self.attempts.get(key, 0) + 1
+            if retry and attempts < self.max_attempts:
+                self.attempts[key] = attempts
+                self.retries_scheduled += 1
+            else:
+                retry = False
+                self.attempts.pop(key, None)
+                self.orders_dead_lettered += 1
+
+        if retry:
+            # Exponential backoff: base, 2*base, 4*base, ... capped at retry_max_delay
+            delay = min(self.retry_base_delay * (2 ** (attempts - 1)), self.retry_max_delay)
+            self.retry_queue.put(entry, delay)
+            return
+
+        self._finish(entry.shard, entry.pk)
+        try:
+            if order is None:
+                # The order never loaded, so fetch it once more to record the failure
+                order = Order.objects.using(entry.shard).get(pk=entry.pk)
+            self._dead_letter(order, attempts, error)
+        except Exception as e:
+            print(f"Error dead-lettering order: {e}")
+
+    def _dead_letter(self, order, attempts, error):
+        shard = shard_for_instance(order)
+        with transaction.atomic(using=shard):
+            self._change_status(order, OrderStatus.FAILED)
+            DeadLetterOrder.objects.using(shard).update_or_create(
+                order=order,
+                defaults={
+                    'attempts': attempts,
+                    'last_error': str(error),
+                    'dead_lettered_at': timezone.now(),
+                },
+            )
+
+    def replay_dead_letter(self, dead_letter):
+        order = dead_letter.order
+        with transaction.atomic(using=shard_for_instance(order)):
+            self._change_status(
+                order,
+                OrderStatus.PENDING,
+                processing_started_at=None,
+                processing_completed_at=None
+            )
+            dead_letter.delete()
+        self.add_order(order)
+        return order
 
     def stop_processing(self):
         self.is_running = False
         if self.processing_thread:
-            self.processing_thread.join()
\ No newline at end of file
+            self.processing_thread.join()
+        self.pipeline.stop()
+        self.retry_queue.stop()
@@ -0,0 +1,117 @@
+import math
+import threading
+import time
+
+
+class LatencyHistogram:
+    """HDR-style histogram with log-spaced buckets.
+
+    Every recorded value is kept within `precision` relative error, so memory
+    depends on the latency range rather than on the number of samples.
+    """
+
+    def __init__(self, precision=0.01, min_value=0.001):
+        self.min_value = min_value
+        self.log_growth = 2 * math.log1p(precision)
+        self.buckets = {}
+        self.count = 0
+
+    def record(self, value):
+        index = 0
+        if value > self.min_value:
+            index = int(math.log(value / self.min_value) / self.log_growth)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+
+    def record_bucket(self, index, count):
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+
+    def percentile(self, percent):
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Geometric midpoint of the bucket
+                return self.min_value * math.exp((index + 0.5) * self.log_growth)
+
+    def percentiles(self, percents=(50, 95, 99)):
+        summary = {}
+        for percent in percents:
+            value = self.percentile(percent)
+            summary[f'p{percent}'] = round(value, 3) if value is not None else None
+        return summary
+
+
+class _Slot:
+    __slots__ = ('epoch', 'created', 'completed', 'processing', 'end_to_end')
+
+    def __init__(self, epoch):
+        self.epoch = epoch
+        self.created = 0
+        self.completed = 0
+        self.processing = LatencyHistogram()
+        self.end_to_end = LatencyHistogram()
+
+
+class RollingMetrics:
+    """Ring of fixed-width time slots covering the last `retention` seconds."""
+
+    def __init__(self, resolution=10, retention=3600, clock=time.time):
+        self.resolution = resolution
+        self.retention = retention
+        self.clock = clock
+        self._slots = [None] * (retention // resolution)
+        self._lock = threading.Lock()
+
+    def record_created(self):
+        with self._lock:
+            self._current_slot().created += 1
+
+    def record_completed(self, processing_seconds, end_to_end_seconds):
+        with self._lock:
+            slot = self._current_slot()
+            slot.completed += 1
+            slot.processing.record(processing_seconds)
+            slot.end_to_end.record(end_to_end_seconds)
+
+    def snapshot(self, window_seconds):
+        """Totals over the last `window_seconds`, plus how many seconds they actually cover."""
+        if window_seconds > self.retention:
+            raise ValueError(f"Window of {window_seconds}s exceeds retention of {self.retention}s")
+
+        created = completed = 0
+        processing = LatencyHistogram()
+        end_to_end = LatencyHistogram()
+        now = self.clock()
+        newest = int(now // self.resolution)
+        oldest = newest - window_seconds // self.resolution
+        # The newest slot is still filling, so the slots cover a little less than the window
+        covered_seconds = (newest - oldest - 1) * self.resolution + (now - newest * self.resolution)
+        with self._lock:
+            for slot in self._slots:
+                if slot is not None and oldest < slot.epoch <= newest:
+                    created += slot.created
+                    completed += slot.completed
+                    processing.merge(slot.processing)
+                    end_to_end.merge(slot.end_to_end)
+        return created, completed, processing, end_to_end, covered_seconds
+
+    def _epoch(self):
+        return int(self.clock() // self.resolution)
+
+    def _current_slot(self):
+        epoch = self._epoch()
+        position = epoch % len(self._slots)
+        slot = self._slots[position]
+        if slot is None or slot.epoch != epoch:
+            slot = self._slots[position] = _Slot(epoch)
+        return slot
@@ -0,0 +1,108 @@
+import hashlib
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.http import Http404
+
+_pinning = threading.local()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_shards():
+    return list(getattr(settings, 'ORDER_SHARDS', ['default']))
+
+
+def get_replicas(shard):
+    return list(getattr(settings, 'ORDER_SHARD_REPLICAS', {}).get(shard, []))
+
+
+def is_replica(alias):
+    return any(alias in replicas for replicas in getattr(settings, 'ORDER_SHARD_REPLICAS', {}).values())
+
+
+def shard_of(alias):
+    for shard in get_shards():
+        if alias == shard or alias in get_replicas(shard):
+            return shard
+    raise ValueError(f"{alias} is not an order shard or replica")
+
+
+def shard_for_user(user_id):
+    shards = get_shards()
+    # md5 rather than hash(), which is salted per process
+    digest = hashlib.md5(str(user_id).encode()).digest()
+    return shards[int.from_bytes(digest[:8], 'big') % len(shards)]
+
+
+def shard_for_instance(instance):
+    # Every other model in the app hangs off an Order and lives in its shard
+    order = getattr(instance, 'order', instance)
+    if order._state.db in get_shards():
+        return order._state.db
+    return shard_for_user(order.user_id)
+
+
+def pin_to_primary():
+    _pinning.pinned = True
+
+
+def unpin():
+    _pinning.pinned = False
+
+
+def is_pinned():
+    return getattr(_pinning, 'pinned', False)
+
+
+def read_alias(shard):
+    replicas = get_replicas(shard)
+    # Inside a transaction, only the primary connection sees its uncommitted writes
+    if is_pinned() or not replicas or connections[shard].in_atomic_block:
+        return shard
+    return random.choice(replicas)
+
+
+def scatter(func, primary=False):
+    """Call `func(alias)` once per shard and return the results in shard order.
+
+    Shards are queried in parallel, except when the calling thread holds an open
+    transaction on one of them: uncommitted rows are only visible to its own connection.
+    """
+    aliases = [shard if primary else read_alias(shard) for shard in get_shards()]
+    if len(aliases) == 1 or any(connections[alias].in_atomic_block for alias in aliases):
+        return [func(alias) for alias in aliases]
+
+    pinned = is_pinned()
+
+    def call(alias):
+        _pinning.pinned = pinned
+        # Pool threads keep their connections between calls, as request threads do;
+        # this drops the ones past CONN_MAX_AGE or left broken by an error
+        close_old_connections()
+        return func(alias)
+
+    return list(_get_executor().map(call, aliases))
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ORDER_SCATTER_THREADS', 16),
+                thread_name_prefix='scatter'
+            )
+        return _executor
+
+
+def get_sharded_object_or_404(queryset, primary=False, **filters):
+    # A single-row lookup is cheap, so the shards are tried in turn until one has it
+    for shard in get_shards():
+        alias = shard if primary else read_alias(shard)
+        match = queryset.using(alias).filter(**filters).first()
+        if match is not None:
+            return match
+    raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
@@ -0,0 +1,51 @@
+import time
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .pipeline import Stage
+
+
+class InvalidOrder(ValueError):
+    """The order itself is wrong, so processing it again would fail the same way."""
+
+# Each entry names a stage, the dotted path of its handler, how many workers
+# run it and how many orders may wait in front of it. Override with the
+# ORDER_PIPELINE_STAGES setting.
+DEFAULT_STAGES = [
+    {'name': 'validation', 'handler': 'orders.core.stages.validate_order', 'workers': 2, 'queue_size': 1000},
+    {'name': 'inventory', 'handler': 'orders.core.stages.reserve_inventory', 'workers': 4, 'queue_size': 500},
+    {'name': 'payment', 'handler': 'orders.core.stages.charge_payment', 'workers': 8, 'queue_size': 500},
+    {'name': 'fulfilment', 'handler': 'orders.core.stages.hand_off_to_fulfilment', 'workers': 2, 'queue_size': 500},
+]
+
+
+def build_stages():
+    return [
+        Stage(
+            config['name'],
+            import_string(config['handler']),
+            workers=config.get('workers', 1),
+            queue_size=config.get('queue_size', 100)
+        )
+        for config in getattr(settings, 'ORDER_PIPELINE_STAGES', DEFAULT_STAGES)
+    ]
+
+
+def validate_order(order):
+    if not isinstance(order.item_ids, list) or not order.item_ids:
+        raise InvalidOrder("item_ids must be a non-empty list")
+    if order.total_amount <= 0:
+        raise InvalidOrder("Total amount must be greater than zero")
+
+
+# The remaining stages stand in for calls to external services and simulate their latency
+
+def reserve_inventory(order):
+    time.sleep(0.2)
+
+
+def charge_payment(order):
+    time.sleep(0.6)
+
+
+def hand_off_to_fulfilment(order):
+    time.sleep(0.2)
@@ -0,0 +1,37 @@
+from orders.core.sharding import get_shards, is_replica, read_alias, shard_for_instance
+
+CLAIM_MODEL = 'orders.orderidclaim'
+
+
+class OrderShardRouter:
+    """Routes `orders` models to the shard selected by a hash of the order's user_id.
+
+    Queries without an instance hint fall through to the default database, so
+    code that reads across shards goes through `orders.core.sharding.scatter`.
+    Order id claims live on the first shard and are always read from its primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower == CLAIM_MODEL:
+            return get_shards()[0]
+        instance = hints.get('instance')
+        if model._meta.app_label != 'orders' or instance is None:
+            return None
+        return read_alias(shard_for_instance(instance))
+
+    def db_for_write(self, model, **hints):
+        if model._meta.label_lower == CLAIM_MODEL:
+            return get_shards()[0]
+        instance = hints.get('instance')
+        if model._meta.app_label != 'orders' or instance is None:
+            return None
+        return shard_for_instance(instance)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if is_replica(db):
+            return False
+        if f'{app_label}.{model_name}' == CLAIM_MODEL:
+            return db == get_shards()[0]
+        if app_label == 'orders':
+            return db in get_shards()
+        return db == 'default'
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from orders.core.journal import OrderJournal
+from orders.core.queue_manager import QueueEntry
+from concurrent.futures import ThreadPoolExecutor
+import os
+import queue
+import tempfile
+import time
+
+class Command(BaseCommand):
+    help = 'Measures queue enqueue overhead with the journal off, async and group-synced'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=20000,
+            help='Number of orders to enqueue per mode'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=16,
+            help='Number of concurrent enqueuing threads, like request workers'
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        threads = options['threads']
+
+        for mode in ['off', 'async', 'group']:
+            with tempfile.TemporaryDirectory() as directory:
+                journal = None
+                if mode != 'off':
+                    journal = OrderJournal(os.path.join(directory, 'orders.journal'), sync=mode)
+                try:
+                    elapsed = self._enqueue(count, threads, journal)
+                finally:
+                    if journal:
+                        journal.close()
+
+            self.stdout.write(
+                f"journal {mode:>5}: {elapsed / count * 1e6:8.1f} us per enqueue, "
+                f"{count / elapsed:10.0f} enqueues/s"
+            )
+
+    def _enqueue(self, count, threads, journal):
+        order_queue = queue.Queue()
+
+        def enqueue(pk):
+            # Mirrors OrderQueue.add_order
+            entry = QueueEntry(pk, 'default', time.time())
+            if journal:
+                journal.record_enqueue(entry.shard, entry.pk, entry.enqueued_at)
+            order_queue.put(entry)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(enqueue, range(count)))
+        return time.perf_counter() - started
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from orders.models import Order, OrderStatus
+from orders.core.queue_manager import QueueEntry
+from decimal import Decimal
+import gc
+import queue
+import time
+import tracemalloc
+
+class Command(BaseCommand):
+    help = 'Measures bytes per queued order for model instances and compact queue entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=100000,
+            help='Number of orders to queue'
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+
+        model_bytes = self._measure(count, self._make_order)
+        entry_bytes = self._measure(count, lambda pk: QueueEntry(pk, 'default', time.time()))
+
+        self.stdout.write(f"Model instances: {model_bytes / count:.0f} bytes per queued order")
+        self.stdout.write(f"Queue entries:   {entry_bytes / count:.0f} bytes per queued order")
+        self.stdout.write(
+            self.style.SUCCESS(f'Queue entries use {model_bytes / entry_bytes:.1f}x less memory')
+        )
+
+    def _measure(self, count, make_item):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            order_queue = queue.Queue()
+            baseline = tracemalloc.get_traced_memory()[0]
+            for pk in range(1, count + 1):
+                order_queue.put(make_item(pk))
+            return tracemalloc.get_traced_memory()[0] - baseline
+        finally:
+            tracemalloc.stop()
+
+    def _make_order(self, pk):
+        # Shaped like an order loaded from the database by the API
+        now = timezone.now()
+        order = Order(
+            id=pk,
+            order_id=f"ORD-{pk:08d}",
+            user_id=f"USER{pk % 1000:03d}",
+            item_ids=[f"ITEM{pk % 5:03d}", f"ITEM{(pk + 1) % 5:03d}"],
+            total_amount=Decimal('199.99'),
+            status=OrderStatus.PENDING,
+            created_at=now,
+            updated_at=now
+        )
+        order._state.adding = False
+        order._state.db = 'default'
+        return order
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from orders.core.export import copy_orders_csv, iter_export
+from orders.core.sharding import get_shards
+import gzip
+import sys
+
+class Command(BaseCommand):
+    help = 'Streams orders created in a time range to a file as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            required=True,
+            help='Export orders created at or after this ISO 8601 datetime'
+        )
+        parser.add_argument(
+            '--end',
+            required=True,
+            help='Export orders created before this ISO 8601 datetime'
+        )
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            default='ndjson',
+            help='Output format'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Gzip-compress the output'
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Output file path, or - for stdout'
+        )
+
+    def handle(self, *args, **options):
+        start = self._parse_datetime(options['start'])
+        end = self._parse_datetime(options['end'])
+        if start >= end:
+            raise CommandError('--start must be before --end')
+
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            stream = gzip.GzipFile(fileobj=output, mode='wb') if options['gzip'] else output
+            if options['format'] == 'csv' and all(connections[shard].vendor == 'postgresql' for shard in get_shards()):
+                copy_orders_csv(start, end, stream)
+            else:
+                for chunk in iter_export(start, end, options['format']):
+                    stream.write(chunk)
+            if stream is not output:
+                stream.close()
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+        if options['output'] != '-':
+            self.stdout.write(
+                self.style.SUCCESS(f"Exported orders to {options['output']}")
+            )
+
+    def _parse_datetime(self, value):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f'Invalid datetime: {value}')
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
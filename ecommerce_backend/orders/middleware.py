@@ -0,0 +1,33 @@
+from django.conf import settings
+
+from orders.core.sharding import pin_to_primary, unpin
+
+PIN_COOKIE = 'orders_read_primary'
+
+
+class ReplicaPinningMiddleware:
+    """Sends a client's reads to the primaries for a short while after it writes.
+
+    Replicas lag behind their primary, so without this an order could 404 on
+    the GET that immediately follows its POST.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.COOKIES.get(PIN_COOKIE):
+            pin_to_primary()
+        try:
+            response = self.get_response(request)
+        finally:
+            unpin()
+
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=getattr(settings, 'ORDER_REPLICA_PIN_SECONDS', 15),
+                httponly=True
+            )
+        return response
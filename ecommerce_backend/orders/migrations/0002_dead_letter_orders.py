@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='DeadLetterOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField()),
+                ('last_error', models.TextField(blank=True)),
+                ('dead_lettered_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dead_letter', to='orders.order')),
+            ],
+            options={
+                'db_table': 'dead_letter_orders',
+                'indexes': [models.Index(fields=['dead_lettered_at'], name='dead_letter_dead_le_708e2f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_dead_letter_orders'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['processing_completed_at'], name='orders_process_3892f0_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_status_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderIdClaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.CharField(max_length=50, unique=True)),
+            ],
+            options={
+                'db_table': 'order_id_claims',
+            },
+        ),
+    ]
@@ -1,10 +1,19 @@
 from django.db import models
 from django.utils import timezone
+from .core.sharding import shard_for_user
 
 class OrderStatus(models.TextChoices):
     PENDING = 'PENDING', 'Pending'
     PROCESSING = 'PROCESSING', 'Processing'
     COMPLETED = 'COMPLETED', 'Completed'
+    FAILED = 'FAILED', 'Failed'
+
+class OrderQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        # Without an explicit database, new orders go to their user's shard
+        if self._db is None and 'user_id' in kwargs:
+            return self.using(shard_for_user(kwargs['user_id'])).create(**kwargs)
+        return super().create(**kwargs)
 
 class Order(models.Model):
     order_id = models.CharField(max_length=50, unique=True)
@@ -21,10 +30,43 @@ class Order(models.Model):
     processing_started_at = models.DateTimeField(null=True, blank=True)
     processing_completed_at = models.DateTimeField(null=True, blank=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         db_table = 'orders'
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['user_id']),
-            models.Index(fields=['created_at'])
+            models.Index(fields=['created_at']),
+            models.Index(fields=['processing_completed_at'])
+        ]
+
+class OrderIdClaim(models.Model):
+    # Each shard's unique index only sees that shard's orders, so when orders are
+    # sharded every order_id is claimed here first; the router keeps this table on
+    # the first shard. Claims outlive their orders, so an order_id is never reused.
+    order_id = models.CharField(max_length=50, unique=True)
+
+    class Meta:
+        db_table = 'order_id_claims'
+
+class DeadLetterOrder(models.Model):
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='dead_letter')
+    attempts = models.PositiveIntegerField()
+    last_error = models.TextField(blank=True)
+    dead_lettered_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'dead_letter_orders'
+        indexes = [
+            models.Index(fields=['dead_lettered_at'])
         ]
+
+class OrderStatusChange(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_changes')
+    from_status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    to_status = models.CharField(max_length=20, choices=OrderStatus.choices)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'order_status_changes'
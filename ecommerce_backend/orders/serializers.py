@@ -1,5 +1,8 @@
+from datetime import timedelta
 from rest_framework import serializers
-from .models import Order, OrderStatus
+from django.db import IntegrityError
+from .models import Order, OrderIdClaim, OrderStatus
+from .core.sharding import get_shards
 
 class OrderSerializer(serializers.Serializer):
     order_id = serializers.CharField(max_length=50)
@@ -25,7 +28,18 @@ class OrderSerializer(serializers.Serializer):
         return value
 
     def create(self, validated_data):
-        return Order.objects.create(**validated_data)
+        # A single database enforces uniqueness itself; across shards the order_id is claimed first
+        if len(get_shards()) == 1:
+            return Order.objects.create(**validated_data)
+        try:
+            claim = OrderIdClaim.objects.create(order_id=validated_data['order_id'])
+        except IntegrityError:
+            raise serializers.ValidationError({'order_id': ["An order with this order_id already exists"]})
+        try:
+            return Order.objects.create(**validated_data)
+        except Exception:
+            claim.delete()
+            raise
 
     def update(self, instance, validated_data):
         instance.order_id = validated_data.get('order_id', instance.order_id)
@@ -33,4 +47,68 @@ class OrderSerializer(serializers.Serializer):
         instance.item_ids = validated_data.get('item_ids', instance.item_ids)
         instance.total_amount = validated_data.get('total_amount', instance.total_amount)
         instance.save()
-        return instance
\ No newline at end of file
+        return instance
+
+METRICS_WINDOWS = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600}
+METRICS_MAX_RANGE = timedelta(days=7)
+
+class MetricsWindowSerializer(serializers.Serializer):
+    window = serializers.ChoiceField(choices=list(METRICS_WINDOWS), default='5m')
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if ('start' in data) != ('end' in data):
+            raise serializers.ValidationError("start and end must be provided together")
+        if 'start' in data and data['start'] >= data['end']:
+            raise serializers.ValidationError("start must be before end")
+        if 'start' in data and data['end'] - data['start'] > METRICS_MAX_RANGE:
+            raise serializers.ValidationError(f"Range must not exceed {METRICS_MAX_RANGE.days} days")
+        return data
+
+class OrderExportSerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    # Not named `format`, which DRF reserves for renderer selection
+    export_format = serializers.ChoiceField(choices=['ndjson', 'csv'], default='ndjson')
+    gzip = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if data['start'] >= data['end']:
+            raise serializers.ValidationError("start must be before end")
+        return data
+
+class OrderBatchStatusRequestSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        allow_empty=False,
+        max_length=5000
+    )
+
+class OrderStatusSerializer(serializers.Serializer):
+    order_id = serializers.CharField(read_only=True)
+    status = serializers.ChoiceField(choices=OrderStatus.choices, read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
+    processing_started_at = serializers.DateTimeField(read_only=True)
+    processing_completed_at = serializers.DateTimeField(read_only=True)
+
+class DeadLetterOrderSerializer(serializers.Serializer):
+    order_id = serializers.CharField(source='order.order_id', read_only=True)
+    user_id = serializers.CharField(source='order.user_id', read_only=True)
+    status = serializers.ChoiceField(source='order.status', choices=OrderStatus.choices, read_only=True)
+    attempts = serializers.IntegerField(read_only=True)
+    last_error = serializers.CharField(read_only=True)
+    dead_lettered_at = serializers.DateTimeField(read_only=True)
+
+class OrderStatusChangeSerializer(serializers.Serializer):
+    cursor = serializers.CharField(read_only=True)
+    order_id = serializers.CharField(source='order.order_id', read_only=True)
+    from_status = serializers.ChoiceField(choices=OrderStatus.choices, read_only=True)
+    to_status = serializers.ChoiceField(choices=OrderStatus.choices, read_only=True)
+    changed_at = serializers.DateTimeField(read_only=True)
+
+class OrderChangesQuerySerializer(serializers.Serializer):
+    since = serializers.CharField(default='0')
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+    wait = serializers.FloatField(min_value=0, max_value=30, default=0)
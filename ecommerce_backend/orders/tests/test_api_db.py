@@ -1,13 +1,17 @@
 from datetime import timedelta
 from decimal import Decimal
+from unittest import mock
 from django.utils import timezone
 from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from orders.models import Order, OrderStatus
+from orders.models import DeadLetterOrder, Order, OrderStatus, OrderStatusChange
+from orders.core.queue_manager import OrderQueue
 
 class OrderViewTests(TransactionTestCase):
+    databases = '__all__'
+
     def setUp(self):
         self.client = APIClient()
         # Create some test orders
@@ -33,6 +37,10 @@ class OrderViewTests(TransactionTestCase):
             status=OrderStatus.COMPLETED
         )
 
+    def tearDown(self):
+        # Let queued orders finish before the database is flushed
+        OrderQueue().queue.join()
+
     def test_get_all_orders(self):
         """Test retrieving all orders"""
         # Make GET request to orders endpoint
@@ -125,6 +133,155 @@ class OrderViewTests(TransactionTestCase):
         with self.assertRaises(Order.DoesNotExist):
             Order.objects.get(order_id='ORD005')
 
+class DeadLetterViewTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.order = Order.objects.create(
+            order_id="DLQ001",
+            user_id="USR001",
+            item_ids=["ITEM001"],
+            total_amount=49.99,
+            status=OrderStatus.FAILED
+        )
+        DeadLetterOrder.objects.create(order=self.order, attempts=5, last_error="payment declined")
+
+    def tearDown(self):
+        # Let queued orders finish before the database is flushed
+        OrderQueue().queue.join()
+
+    def test_list_dead_letters(self):
+        response = self.client.get(reverse('dead-letter-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['order_id'], "DLQ001")
+        self.assertEqual(response.data[0]['attempts'], 5)
+        self.assertEqual(response.data[0]['last_error'], "payment declined")
+
+    def test_replay_dead_letter(self):
+        with mock.patch.object(OrderQueue().rolling_metrics, 'record_created') as record_created:
+            response = self.client.post(reverse('dead-letter-replay', args=[self.order.order_id]))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        # A replay is not a new order
+        record_created.assert_not_called()
+        self.assertFalse(DeadLetterOrder.objects.filter(order=self.order).exists())
+        self.order.refresh_from_db()
+        self.assertNotEqual(self.order.status, OrderStatus.FAILED)
+
+    def test_replay_unknown_dead_letter(self):
+        response = self.client.post(reverse('dead-letter-replay', args=['NONEXISTENT']))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class OrderChangesViewTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.order = Order.objects.create(
+            order_id="CHG001",
+            user_id="USR001",
+            item_ids=["ITEM001"],
+            total_amount=19.99
+        )
+        self.changes = [
+            OrderStatusChange.objects.create(
+                order=self.order, from_status=OrderStatus.PENDING, to_status=OrderStatus.PROCESSING
+            ),
+            OrderStatusChange.objects.create(
+                order=self.order, from_status=OrderStatus.PROCESSING, to_status=OrderStatus.COMPLETED
+            ),
+        ]
+
+    def test_changes_since_cursor(self):
+        response = self.client.get(reverse('order-changes'), {'since': 0, 'limit': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['changes']), 1)
+        self.assertEqual(response.data['changes'][0]['order_id'], "CHG001")
+        self.assertEqual(response.data['changes'][0]['to_status'], OrderStatus.PROCESSING)
+        self.assertTrue(response.data['has_more'])
+
+        # Resume from the returned cursor
+        response = self.client.get(reverse('order-changes'), {'since': response.data['next_cursor']})
+
+        self.assertEqual([change['to_status'] for change in response.data['changes']], [OrderStatus.COMPLETED])
+        self.assertEqual(response.data['next_cursor'], response.data['changes'][-1]['cursor'])
+        self.assertFalse(response.data['has_more'])
+
+    def test_changes_keep_id_order_when_timestamps_are_inverted(self):
+        # changed_at is set before the insert, so concurrent writers can commit out of time order
+        OrderStatusChange.objects.filter(id=self.changes[0].id).update(
+            changed_at=self.changes[1].changed_at + timedelta(milliseconds=5)
+        )
+
+        response = self.client.get(reverse('order-changes'), {'since': 0})
+
+        self.assertEqual(
+            [change['to_status'] for change in response.data['changes']],
+            [OrderStatus.PROCESSING, OrderStatus.COMPLETED]
+        )
+        self.assertEqual(response.data['next_cursor'], str(self.changes[1].id))
+
+    def test_long_poll_without_changes(self):
+        since = self.client.get(reverse('order-changes')).data['next_cursor']
+        response = self.client.get(reverse('order-changes'), {'since': since, 'wait': 0.2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['changes'], [])
+        self.assertEqual(response.data['next_cursor'], since)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('order-changes'), {'since': 'abc'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class OrderBatchStatusViewTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(3):
+            Order.objects.create(
+                order_id=f"BATCH-{i}",
+                user_id=f"USR00{i}",
+                item_ids=["ITEM001"],
+                total_amount=9.99,
+                status=OrderStatus.COMPLETED if i == 0 else OrderStatus.PENDING
+            )
+
+    def test_batch_status(self):
+        response = self.client.post(
+            reverse('orders-batch-status'),
+            {'order_ids': ["BATCH-2", "MISSING-1", "BATCH-0", "BATCH-2"]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([order['order_id'] for order in response.data['orders']], ["BATCH-2", "BATCH-0"])
+        self.assertEqual(response.data['orders'][1]['status'], OrderStatus.COMPLETED)
+        self.assertIn('processing_completed_at', response.data['orders'][0])
+        self.assertEqual(response.data['missing'], ["MISSING-1"])
+
+    def test_batch_status_chunks_large_batches(self):
+        order_ids = [f"MISSING-{i}" for i in range(1200)] + ["BATCH-1"]
+
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse('orders-batch-status'), {'order_ids': order_ids}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([order['order_id'] for order in response.data['orders']], ["BATCH-1"])
+        self.assertEqual(len(response.data['missing']), 1200)
+
+    def test_batch_status_rejects_oversized_batch(self):
+        order_ids = [f"ORD-{i}" for i in range(5001)]
+        response = self.client.post(reverse('orders-batch-status'), {'order_ids': order_ids}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 class OrderDatabaseTests(TestCase):
     def setUp(self):
         # Create test orders directly in the database
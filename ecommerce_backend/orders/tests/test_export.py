@@ -0,0 +1,90 @@
+from datetime import timedelta
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from orders.models import Order
+
+class OrderExportTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.now = timezone.now()
+        for i in range(3):
+            Order.objects.create(
+                order_id=f"EXPORT-{i}",
+                user_id="USER-001",
+                item_ids=[i, i + 1],
+                total_amount=10 + i,
+                created_at=self.now - timedelta(hours=i)
+            )
+        self.params = {
+            'start': (self.now - timedelta(hours=1, minutes=30)).isoformat(),
+            'end': (self.now + timedelta(minutes=1)).isoformat(),
+        }
+
+    def _content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_export_ndjson(self):
+        response = self.client.get(reverse('orders-export'), self.params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self._content(response).decode().splitlines()]
+        self.assertEqual([row['order_id'] for row in rows], ["EXPORT-1", "EXPORT-0"])
+        self.assertEqual(rows[1]['item_ids'], [0, 1])
+
+    def test_export_csv_gzip(self):
+        response = self.client.get(
+            reverse('orders-export'),
+            {**self.params, 'export_format': 'csv', 'gzip': 'true'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(self._content(response)).decode())))
+        self.assertEqual([row['order_id'] for row in rows], ["EXPORT-1", "EXPORT-0"])
+        self.assertEqual(json.loads(rows[0]['item_ids']), [1, 2])
+        # Matches the timestamps written by the COPY path of the export_orders command
+        self.assertEqual(
+            rows[0]['created_at'],
+            (self.now - timedelta(hours=1)).isoformat(timespec='microseconds')
+        )
+        self.assertEqual(rows[0]['processing_started_at'], '')
+
+        # NDJSON writes the same timestamps, down to the microsecond
+        response = self.client.get(reverse('orders-export'), self.params)
+        ndjson_rows = [json.loads(line) for line in self._content(response).decode().splitlines()]
+        self.assertEqual(ndjson_rows[0]['created_at'], rows[0]['created_at'])
+
+    def test_export_requires_range(self):
+        response = self.client.get(reverse('orders-export'))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'orders.ndjson.gz')
+            call_command(
+                'export_orders',
+                start=self.params['start'],
+                end=self.params['end'],
+                gzip=True,
+                output=path,
+                stdout=io.StringIO()
+            )
+            with gzip.open(path, 'rt') as exported:
+                rows = [json.loads(line) for line in exported]
+
+        self.assertEqual([row['order_id'] for row in rows], ["EXPORT-1", "EXPORT-0"])
@@ -0,0 +1,87 @@
+import os
+import tempfile
+from django.test import SimpleTestCase
+
+from orders.core.journal import GROW_BYTES, RECORD, JournalLocked, OrderJournal
+
+class OrderJournalTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'orders.journal')
+
+    def test_replay_returns_unfinished_orders(self):
+        journal = OrderJournal(self.path)
+        journal.record_enqueue('default', 1, 100.0)
+        journal.record_enqueue('default', 2, 101.0)
+        journal.record_enqueue('default', 3, 102.0)
+        journal.record_complete('default', 2)
+        journal.close()
+
+        journal = OrderJournal(self.path)
+        try:
+            self.assertEqual(journal.replay(), [('default', 1, 100.0), ('default', 3, 102.0)])
+        finally:
+            journal.close()
+
+    def test_torn_tail_is_discarded(self):
+        journal = OrderJournal(self.path)
+        journal.record_enqueue('default', 1, 100.0)
+        journal.record_enqueue('default', 2, 101.0)
+        journal.close()
+
+        # Corrupt the last record as a crash mid-write would
+        with open(self.path, 'r+b') as journal_file:
+            journal_file.seek(RECORD.size + 5)
+            journal_file.write(b'\xff\xff')
+
+        journal = OrderJournal(self.path)
+        try:
+            self.assertEqual(journal.replay(), [('default', 1, 100.0)])
+            journal.record_enqueue('default', 4, 103.0)
+        finally:
+            journal.close()
+
+        journal = OrderJournal(self.path)
+        try:
+            self.assertEqual(journal.replay(), [('default', 1, 100.0), ('default', 4, 103.0)])
+        finally:
+            journal.close()
+
+    def test_compaction_keeps_live_orders(self):
+        journal = OrderJournal(self.path, compact_min_records=10)
+        for pk in range(1, 11):
+            journal.record_enqueue('default', pk, float(pk))
+        for pk in range(1, 10):
+            journal.record_complete('default', pk)
+        journal.record_enqueue('default', 11, 11.0)
+        journal.close()
+
+        self.assertEqual(os.path.getsize(self.path), GROW_BYTES)
+        journal = OrderJournal(self.path)
+        try:
+            self.assertEqual(journal.replay(), [('default', 10, 10.0), ('default', 11, 11.0)])
+            self.assertLess(journal._records, 20)
+        finally:
+            journal.close()
+
+    def test_journal_grows_past_initial_size(self):
+        journal = OrderJournal(self.path, sync='async')
+        count = GROW_BYTES // RECORD.size + 10
+        for pk in range(count):
+            journal.record_enqueue('default', pk, float(pk))
+        journal.close()
+
+        journal = OrderJournal(self.path)
+        try:
+            self.assertEqual(len(journal.replay()), count)
+        finally:
+            journal.close()
+
+    def test_single_writer(self):
+        journal = OrderJournal(self.path)
+        try:
+            with self.assertRaises(JournalLocked):
+                OrderJournal(self.path)
+        finally:
+            journal.close()
@@ -0,0 +1,112 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from orders.models import Order, OrderStatus
+from orders.core.rolling_metrics import LatencyHistogram, RollingMetrics
+
+class LatencyHistogramTests(TestCase):
+    def test_percentiles_within_precision(self):
+        histogram = LatencyHistogram()
+        for millis in range(1, 1001):
+            histogram.record(millis / 1000)
+
+        self.assertAlmostEqual(histogram.percentile(50), 0.5, delta=0.5 * 0.01)
+        self.assertAlmostEqual(histogram.percentile(95), 0.95, delta=0.95 * 0.01)
+        self.assertAlmostEqual(histogram.percentile(99), 0.99, delta=0.99 * 0.01)
+
+    def test_empty_histogram(self):
+        self.assertEqual(LatencyHistogram().percentiles(), {'p50': None, 'p95': None, 'p99': None})
+
+class RollingMetricsTests(TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.metrics = RollingMetrics(resolution=10, retention=300, clock=lambda: self.now)
+
+    def test_snapshot_only_includes_window(self):
+        self.metrics.record_created()
+        self.metrics.record_completed(1.0, 2.0)
+        self.now += 120
+        self.metrics.record_created()
+        self.metrics.record_completed(3.0, 4.0)
+
+        created, completed, processing, end_to_end, _ = self.metrics.snapshot(60)
+        self.assertEqual((created, completed), (1, 1))
+        self.assertAlmostEqual(processing.percentile(50), 3.0, delta=0.03)
+
+        created, completed, processing, end_to_end, _ = self.metrics.snapshot(300)
+        self.assertEqual((created, completed), (2, 2))
+        self.assertEqual(end_to_end.count, 2)
+
+    def test_expired_slots_are_reused(self):
+        self.metrics.record_created()
+        self.now += 300
+        self.metrics.record_created()
+
+        created, _, _, _, _ = self.metrics.snapshot(300)
+        self.assertEqual(created, 1)
+
+    def test_snapshot_reports_covered_seconds(self):
+        self.now += 4
+        self.metrics.record_created()
+
+        # Five full slots plus the 4s of the slot still filling
+        created, _, _, _, covered_seconds = self.metrics.snapshot(60)
+        self.assertEqual(created, 1)
+        self.assertEqual(covered_seconds, 54)
+
+class OrderWindowedMetricsViewTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        now = timezone.now()
+        for i in range(4):
+            Order.objects.create(
+                order_id=f"METRICS-{i}",
+                user_id="USER-001",
+                item_ids=[i],
+                total_amount=10,
+                status=OrderStatus.COMPLETED,
+                created_at=now - timedelta(hours=2, seconds=10),
+                processing_started_at=now - timedelta(hours=2, seconds=5),
+                processing_completed_at=now - timedelta(hours=2, seconds=5 - (i + 1))
+            )
+
+    def test_memory_window(self):
+        response = self.client.get(reverse('order-metrics-windowed'), {'window': '1m'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['source'], 'memory')
+        self.assertEqual(response.data['window_seconds'], 60)
+        self.assertIn('p99', response.data['processing_time_seconds'])
+
+    def test_historical_range(self):
+        end = timezone.now() - timedelta(hours=1)
+        response = self.client.get(reverse('order-metrics-windowed'), {
+            'start': (end - timedelta(hours=2)).isoformat(),
+            'end': end.isoformat(),
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['source'], 'database')
+        self.assertEqual(response.data['orders_completed_per_minute'], round(4 / 120, 3))
+        self.assertAlmostEqual(response.data['processing_time_seconds']['p50'], 2.0, delta=0.03)
+        self.assertAlmostEqual(response.data['end_to_end_latency_seconds']['p99'], 9.0, delta=0.1)
+
+    def test_historical_range_is_capped(self):
+        end = timezone.now()
+        response = self.client.get(reverse('order-metrics-windowed'), {
+            'start': (end - timedelta(days=8)).isoformat(),
+            'end': end.isoformat(),
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_window(self):
+        response = self.client.get(reverse('order-metrics-windowed'), {'window': '7d'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
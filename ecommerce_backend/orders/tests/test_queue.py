@@ -1,15 +1,37 @@
-from django.test import TestCase, TransactionTestCase
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.utils import timezone
 from datetime import timedelta
+from unittest import mock
+import os
+import tempfile
+import threading
 import time
 
 from orders.models import Order, OrderStatus
+from orders.core.delay_queue import DelayQueue
+from orders.core.journal import OrderJournal
+from orders.core.pipeline import Pipeline, Stage
 from orders.core.queue_manager import OrderQueue
+from orders.core.sharding import shard_for_instance
 
 class OrderQueueTests(TransactionTestCase):
+    databases = '__all__'
+
     def setUp(self):
         self.queue_manager = OrderQueue()
         self.queue_manager.start_processing()
+        self.retry_settings = (
+            self.queue_manager.max_attempts,
+            self.queue_manager.retry_base_delay,
+        )
+        self.queue_manager.max_attempts = 3
+        self.queue_manager.retry_base_delay = 0.1
+
+    def tearDown(self):
+        # Let queued orders finish before the database is flushed
+        self.queue_manager.queue.join()
+        self.queue_manager.max_attempts, self.queue_manager.retry_base_delay = self.retry_settings
 
     def test_order_processing_flow(self):
         # Create a test order
@@ -27,7 +49,7 @@ class OrderQueueTests(TransactionTestCase):
         max_wait = 5  # seconds
         start_time = time.time()
         while time.time() - start_time < max_wait:
-            # order.refresh_from_db()
+            order.refresh_from_db()
             if order.status == OrderStatus.COMPLETED:
                 break
             time.sleep(0.1)
@@ -38,6 +60,15 @@ class OrderQueueTests(TransactionTestCase):
         self.assertIsNotNone(order.processing_completed_at)
         self.assertTrue(order.processing_completed_at > order.processing_started_at)
 
+        # Verify every transition was logged in order
+        transitions = list(
+            order.status_changes.order_by('id').values_list('from_status', 'to_status')
+        )
+        self.assertEqual(transitions, [
+            (OrderStatus.PENDING, OrderStatus.PROCESSING),
+            (OrderStatus.PROCESSING, OrderStatus.COMPLETED),
+        ])
+
     def test_multiple_orders_processing(self):
         # Create multiple test orders
         orders = []
@@ -107,3 +138,264 @@ class OrderQueueTests(TransactionTestCase):
         # Verify order has been processed
         order1.refresh_from_db()
         self.assertEqual(order1.status, OrderStatus.COMPLETED)
+
+    def test_failed_order_is_retried(self):
+        order = Order.objects.create(
+            order_id="QUEUE-TEST-RETRY",
+            user_id="USER-001",
+            item_ids=[1],
+            total_amount=99.99
+        )
+        payment = self.queue_manager.pipeline.get_stage('payment')
+        charge_payment = payment.handler
+        calls = []
+
+        def fail_once(order):
+            calls.append(order.pk)
+            if len(calls) == 1:
+                raise RuntimeError("payment gateway timeout")
+            charge_payment(order)
+
+        with mock.patch.object(payment, 'handler', side_effect=fail_once):
+            retries_before = self.queue_manager.get_stats()['retries_scheduled']
+            self.queue_manager.add_order(order)
+            time.sleep(3)
+
+        order.refresh_from_db()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(order.status, OrderStatus.COMPLETED)
+        self.assertEqual(self.queue_manager.get_stats()['retries_scheduled'], retries_before + 1)
+        self.assertFalse(hasattr(order, 'dead_letter'))
+        # The retry is not a transition of its own
+        transitions = list(
+            order.status_changes.order_by('id').values_list('from_status', 'to_status')
+        )
+        self.assertEqual(transitions, [
+            (OrderStatus.PENDING, OrderStatus.PROCESSING),
+            (OrderStatus.PROCESSING, OrderStatus.COMPLETED),
+        ])
+
+    def test_failed_completion_does_not_repeat_stages(self):
+        order = Order.objects.create(
+            order_id="QUEUE-TEST-COMPLETE",
+            user_id="USER-001",
+            item_ids=[1],
+            total_amount=99.99
+        )
+        payment = self.queue_manager.pipeline.get_stage('payment')
+        change_status = self.queue_manager._change_status
+        completions = []
+
+        def fail_first_completion(order, status, **fields):
+            if status == OrderStatus.COMPLETED:
+                completions.append(order.pk)
+                if len(completions) == 1:
+                    raise DatabaseError("connection lost")
+            change_status(order, status, **fields)
+
+        with mock.patch.object(self.queue_manager, '_change_status', side_effect=fail_first_completion), \
+                mock.patch.object(payment, 'handler') as charge_payment:
+            self.queue_manager.add_order(order)
+            time.sleep(2)
+
+        order.refresh_from_db()
+        self.assertEqual(len(completions), 2)
+        self.assertEqual(order.status, OrderStatus.COMPLETED)
+        charge_payment.assert_called_once()
+
+    def test_exhausted_order_is_dead_lettered(self):
+        order = Order.objects.create(
+            order_id="QUEUE-TEST-DEAD",
+            user_id="USER-001",
+            item_ids=[1],
+            total_amount=99.99
+        )
+
+        inventory = self.queue_manager.pipeline.get_stage('inventory')
+        with mock.patch.object(inventory, 'handler', side_effect=RuntimeError("out of stock")):
+            self.queue_manager.add_order(order)
+            time.sleep(2)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, OrderStatus.FAILED)
+        dead_letter = order.dead_letter
+        self.assertEqual(dead_letter.attempts, 3)
+        self.assertEqual(dead_letter.last_error, "out of stock")
+
+    def test_load_failures_count_attempts(self):
+        order = Order.objects.create(
+            order_id="QUEUE-TEST-LOAD",
+            user_id="USER-001",
+            item_ids=[1],
+            total_amount=99.99
+        )
+
+        with mock.patch.object(
+            self.queue_manager, '_load_orders', side_effect=DatabaseError("connection lost")
+        ) as load_orders:
+            self.queue_manager.add_order(order)
+            time.sleep(2)
+
+        order.refresh_from_db()
+        self.assertEqual(load_orders.call_count, 3)
+        self.assertEqual(order.status, OrderStatus.FAILED)
+        self.assertEqual(order.dead_letter.attempts, 3)
+
+    def test_invalid_order_is_dead_lettered_without_retries(self):
+        order = Order.objects.create(
+            order_id="QUEUE-TEST-INVALID",
+            user_id="USER-001",
+            item_ids=[],
+            total_amount=99.99
+        )
+
+        retries_before = self.queue_manager.get_stats()['retries_scheduled']
+        self.queue_manager.add_order(order)
+        time.sleep(1)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, OrderStatus.FAILED)
+        self.assertEqual(order.dead_letter.attempts, 1)
+        self.assertEqual(self.queue_manager.get_stats()['retries_scheduled'], retries_before)
+
+    def test_replayed_entry_for_completed_order_is_not_dispatched(self):
+        now = timezone.now()
+        order = Order.objects.create(
+            order_id="QUEUE-TEST-REPLAY",
+            user_id="USER-001",
+            item_ids=[1],
+            total_amount=99.99,
+            status=OrderStatus.COMPLETED,
+            processing_started_at=now - timedelta(seconds=1),
+            processing_completed_at=now
+        )
+        # The process crashed after the order completed but before its completion was journaled
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'orders.journal')
+        journal = OrderJournal(path)
+        journal.record_enqueue(shard_for_instance(order), order.pk, time.time())
+        journal.close()
+
+        validation = self.queue_manager.pipeline.get_stage('validation')
+        previous_journal = self.queue_manager.journal
+        self.queue_manager.stop_processing()
+        with override_settings(ORDER_JOURNAL_PATH=path), mock.patch.object(validation, 'handler') as validate:
+            self.queue_manager.journal = self.queue_manager._open_journal()
+            try:
+                self.queue_manager.start_processing()
+                self.queue_manager.queue.join()
+            finally:
+                self.queue_manager.journal.close()
+                self.queue_manager.journal = previous_journal
+
+        validate.assert_not_called()
+        order.refresh_from_db()
+        self.assertEqual(order.status, OrderStatus.COMPLETED)
+        self.assertFalse(order.status_changes.exists())
+        journal = OrderJournal(path)
+        try:
+            self.assertEqual(journal.replay(), [])
+        finally:
+            journal.close()
+
+    def test_replayed_backlog_is_processed_without_a_request(self):
+        order = Order.objects.create(
+            order_id="QUEUE-TEST-STARTUP",
+            user_id="USER-001",
+            item_ids=[1],
+            total_amount=99.99
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'orders.journal')
+        journal = OrderJournal(path)
+        journal.record_enqueue(shard_for_instance(order), order.pk, time.time())
+        journal.close()
+
+        # A fresh process: the first OrderQueue() replays the journal
+        with override_settings(ORDER_JOURNAL_PATH=path), mock.patch.object(OrderQueue, '_instance', None):
+            restarted = OrderQueue()
+            try:
+                self.assertTrue(restarted.is_running)
+                restarted.queue.join()
+            finally:
+                restarted.stop_processing()
+                restarted.journal.close()
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, OrderStatus.COMPLETED)
+
+
+class DelayQueueTests(TestCase):
+    def test_items_released_in_due_order(self):
+        released = []
+        delay_queue = DelayQueue(released.append)
+        delay_queue.start()
+        try:
+            delay_queue.put('late', 0.3)
+            delay_queue.put('early', 0.1)
+            self.assertEqual(len(delay_queue), 2)
+            time.sleep(0.5)
+        finally:
+            delay_queue.stop()
+
+        self.assertEqual(released, ['early', 'late'])
+        self.assertEqual(len(delay_queue), 0)
+
+
+class PipelineTests(TestCase):
+    def test_stages_overlap_across_orders(self):
+        completed = []
+        done = threading.Event()
+
+        def complete(order):
+            completed.append(order)
+            if len(completed) == 4:
+                done.set()
+
+        pipeline = Pipeline(
+            [
+                Stage('first', lambda order: time.sleep(0.2), workers=4),
+                Stage('second', lambda order: time.sleep(0.2), workers=4),
+            ],
+            complete,
+            lambda order, error, position: None
+        )
+        pipeline.start()
+        try:
+            started = time.monotonic()
+            for order in range(4):
+                pipeline.submit(order)
+            self.assertTrue(done.wait(2))
+            elapsed = time.monotonic() - started
+        finally:
+            pipeline.stop()
+
+        # Run one after another, four orders through two 0.2s stages would take 1.6s
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(sorted(completed), [0, 1, 2, 3])
+
+    def test_stats_identify_bottleneck(self):
+        failures = []
+        pipeline = Pipeline(
+            [
+                Stage('fast', lambda order: None),
+                Stage('slow', lambda order: time.sleep(0.1)),
+            ],
+            lambda order: None,
+            lambda order, error, position: failures.append(error)
+        )
+        pipeline.start()
+        try:
+            for order in range(3):
+                pipeline.submit(order)
+            time.sleep(0.5)
+        finally:
+            pipeline.stop()
+
+        stats = pipeline.get_stats()
+        self.assertEqual(stats['bottleneck'], 'slow')
+        self.assertEqual([stage['processed'] for stage in stats['stages']], [3, 3])
+        self.assertGreater(stats['stages'][1]['average_wait_seconds'], 0)
+        self.assertEqual(failures, [])
@@ -0,0 +1,159 @@
+from collections import defaultdict
+from unittest import mock, skipUnless
+import threading
+from django.conf import settings
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from orders.db_router import OrderShardRouter
+from orders.middleware import PIN_COOKIE
+from orders.models import Order, OrderIdClaim
+from orders.core.queue_manager import OrderQueue
+from orders.core.sharding import get_shards, pin_to_primary, read_alias, scatter, shard_for_user, unpin
+
+SHARDS = ['default', 'shard_1', 'shard_2']
+REPLICAS = {'default': ['default_replica'], 'shard_1': ['shard_1_replica'], 'shard_2': ['shard_2_replica']}
+
+@override_settings(ORDER_SHARDS=SHARDS, ORDER_SHARD_REPLICAS=REPLICAS)
+class ShardRoutingTests(SimpleTestCase):
+    def setUp(self):
+        # The shard aliases above are not configured databases here
+        idle_connections = defaultdict(lambda: mock.Mock(in_atomic_block=False))
+        patcher = mock.patch('orders.core.sharding.connections', idle_connections)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_shard_for_user_is_stable_and_spread(self):
+        self.assertEqual(shard_for_user("USER-42"), shard_for_user("USER-42"))
+        used_shards = {shard_for_user(f"USER-{i}") for i in range(100)}
+        self.assertEqual(used_shards, set(SHARDS))
+
+    def test_reads_use_replicas_unless_pinned(self):
+        self.assertEqual(read_alias('shard_1'), 'shard_1_replica')
+        pin_to_primary()
+        try:
+            self.assertEqual(read_alias('shard_1'), 'shard_1')
+        finally:
+            unpin()
+
+    def test_scatter_runs_on_shared_pool(self):
+        results = scatter(lambda alias: (alias, threading.current_thread().name))
+
+        self.assertEqual([alias for alias, _ in results], [REPLICAS[shard][0] for shard in SHARDS])
+        self.assertTrue(all(thread.startswith('scatter') for _, thread in results))
+
+    def test_router_uses_instance_shard(self):
+        router = OrderShardRouter()
+        order = Order(order_id="ROUTE-1", user_id="USER-7", item_ids=[1], total_amount=10)
+        shard = shard_for_user("USER-7")
+
+        self.assertEqual(router.db_for_write(Order, instance=order), shard)
+        self.assertEqual(router.db_for_read(Order, instance=order), REPLICAS[shard][0])
+        self.assertIsNone(router.db_for_write(Order))
+
+    def test_router_keeps_claims_on_first_shard(self):
+        router = OrderShardRouter()
+
+        self.assertEqual(router.db_for_read(OrderIdClaim), 'default')
+        self.assertEqual(router.db_for_write(OrderIdClaim), 'default')
+        self.assertTrue(router.allow_migrate('default', 'orders', 'orderidclaim'))
+        self.assertFalse(router.allow_migrate('shard_1', 'orders', 'orderidclaim'))
+
+    def test_router_migrations(self):
+        router = OrderShardRouter()
+
+        self.assertTrue(router.allow_migrate('shard_1', 'orders'))
+        self.assertFalse(router.allow_migrate('shard_1', 'auth'))
+        self.assertFalse(router.allow_migrate('shard_1_replica', 'orders'))
+
+@skipUnless(len(settings.ORDER_SHARDS) > 1, "Run with --settings=ecommerce_backend.settings_sharded")
+class ShardedOrderApiTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def tearDown(self):
+        # Let queued orders finish before the database is flushed
+        OrderQueue().queue.join()
+
+    def _create(self, index):
+        response = self.client.post(reverse('orders-list'), {
+            'order_id': f"SHARD-{index}",
+            'user_id': f"USER-{index}",
+            'item_ids': [index],
+            'total_amount': 10 + index,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response
+
+    def test_orders_are_spread_and_gathered(self):
+        for index in range(12):
+            self._create(index)
+
+        for index in range(12):
+            shard = shard_for_user(f"USER-{index}")
+            self.assertTrue(Order.objects.using(shard).filter(order_id=f"SHARD-{index}").exists())
+        self.assertGreater(sum(1 for shard in get_shards() if Order.objects.using(shard).exists()), 1)
+
+        response = self.client.get(reverse('orders-list'))
+        self.assertEqual(len(response.data), 12)
+
+        response = self.client.get(reverse('order-detail', args=["SHARD-5"]))
+        self.assertEqual(response.data['user_id'], "USER-5")
+
+        response = self.client.get(reverse('order-metrics'))
+        self.assertEqual(sum(response.data['status_counts'].values()), 12)
+
+    def test_create_pins_reads_to_primary(self):
+        response = self._create(1)
+
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_duplicate_order_id_across_shards(self):
+        self._create(1)
+        response = self.client.post(reverse('orders-list'), {
+            'order_id': "SHARD-1",
+            'user_id': "USER-2",
+            'item_ids': [1],
+            'total_amount': 10,
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_concurrent_duplicate_order_ids_on_different_shards(self):
+        user_ids = {}
+        for index in range(100):
+            user_ids.setdefault(shard_for_user(f"USER-{index}"), f"USER-{index}")
+        barrier = threading.Barrier(2)
+        status_codes = []
+
+        def create(user_id):
+            barrier.wait()
+            try:
+                response = APIClient().post(reverse('orders-list'), {
+                    'order_id': "SHARD-RACE",
+                    'user_id': user_id,
+                    'item_ids': [1],
+                    'total_amount': 10,
+                }, format='json')
+                status_codes.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=create, args=(user_id,)) for user_id in list(user_ids.values())[:2]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(status_codes), [status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST])
+        self.assertEqual(sum(Order.objects.using(shard).filter(order_id="SHARD-RACE").count() for shard in get_shards()), 1)
+
+    def test_change_feed_cursor_covers_all_shards(self):
+        response = self.client.get(reverse('order-changes'))
+
+        self.assertEqual(response.data['next_cursor'], '.'.join(['0'] * len(get_shards())))
@@ -1,12 +1,22 @@
 from django.urls import path
 
 from orders.views.order import OrderView
-from orders.views.metrics import OrderMetricsView
+from orders.views.metrics import OrderMetricsView, OrderWindowedMetricsView
+from orders.views.export import OrderExportView
+from orders.views.changes import OrderChangesView
+from orders.views.batch_status import OrderBatchStatusView
+from orders.views.dead_letter import DeadLetterListView, DeadLetterReplayView
 
 
 
 urlpatterns = [
     path('orders/', OrderView.as_view(), name='orders-list'),
+    path('orders/batch-status/', OrderBatchStatusView.as_view(), name='orders-batch-status'),
+    path('orders/changes', OrderChangesView.as_view(), name='order-changes'),
+    path('orders/export/', OrderExportView.as_view(), name='orders-export'),
+    path('orders/dead-letters/', DeadLetterListView.as_view(), name='dead-letter-list'),
+    path('orders/dead-letters/<str:order_id>/replay/', DeadLetterReplayView.as_view(), name='dead-letter-replay'),
     path('orders/<str:order_id>', OrderView.as_view(), name='order-detail'),
     path('orders/metrics/', OrderMetricsView.as_view(), name='order-metrics'),
+    path('orders/metrics/windowed/', OrderWindowedMetricsView.as_view(), name='order-metrics-windowed'),
 ]
\ No newline at end of file
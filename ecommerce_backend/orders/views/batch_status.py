@@ -0,0 +1,44 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from orders.models import Order
+from orders.serializers import OrderBatchStatusRequestSerializer, OrderStatusSerializer
+from orders.core.sharding import scatter
+
+class OrderBatchStatusView(APIView):
+    # Keeps each IN list, and so each query plan and parameter list, a manageable size
+    chunk_size = 500
+    status_fields = [
+        'order_id',
+        'status',
+        'created_at',
+        'updated_at',
+        'processing_started_at',
+        'processing_completed_at',
+    ]
+
+    def post(self, request):
+        serializer = OrderBatchStatusRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order_ids = list(dict.fromkeys(serializer.validated_data['order_ids']))
+
+        found = {}
+        for shard_orders in scatter(lambda alias: self._get_statuses(alias, order_ids)):
+            found.update(shard_orders)
+
+        return Response({
+            'orders': OrderStatusSerializer(
+                [found[order_id] for order_id in order_ids if order_id in found],
+                many=True
+            ).data,
+            'missing': [order_id for order_id in order_ids if order_id not in found]
+        })
+
+    def _get_statuses(self, alias, order_ids):
+        statuses = {}
+        for start in range(0, len(order_ids), self.chunk_size):
+            chunk = order_ids[start:start + self.chunk_size]
+            # order_id is unique, so this is an index lookup per id
+            for row in Order.objects.using(alias).filter(order_id__in=chunk).values(*self.status_fields):
+                statuses[row['order_id']] = row
+        return statuses
@@ -0,0 +1,77 @@
+import heapq
+import time
+from rest_framework import serializers
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from orders.models import OrderStatusChange
+from orders.serializers import OrderChangesQuerySerializer, OrderStatusChangeSerializer
+from orders.core.queue_manager import OrderQueue
+from orders.core.sharding import get_shards, scatter, shard_of
+
+class OrderChangesView(APIView):
+    # Upper bound between database checks while long-polling, for changes
+    # committed by other processes that this process is not notified about
+    poll_interval = 0.5
+
+    def get(self, request):
+        serializer = OrderChangesQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        since = self._parse_cursor(params['since'])
+
+        deadline = time.monotonic() + params['wait']
+        changes, cursor, has_more = self._get_changes(since, params['limit'])
+        while not changes and time.monotonic() < deadline:
+            OrderQueue().wait_for_status_change(min(self.poll_interval, deadline - time.monotonic()))
+            changes, cursor, has_more = self._get_changes(since, params['limit'])
+
+        return Response({
+            'changes': OrderStatusChangeSerializer(changes, many=True).data,
+            'next_cursor': self._format_cursor(cursor),
+            'has_more': has_more
+        })
+
+    def _get_changes(self, since, limit):
+        shards = get_shards()
+        shard_changes = scatter(lambda alias: list(
+            OrderStatusChange.objects.using(alias).select_related('order').filter(
+                id__gt=since[shards.index(shard_of(alias))]
+            ).order_by('id')[:limit]
+        ))
+
+        # Each shard stays in id order, so its cursor only moves forward; changed_at
+        # is taken before the insert and only decides how the shards are interleaved
+        merged = list(heapq.merge(
+            *(
+                [(position, change) for change in changes]
+                for position, changes in enumerate(shard_changes)
+            ),
+            key=lambda entry: entry[1].changed_at
+        ))
+
+        cursor = list(since)
+        changes = []
+        for position, change in merged[:limit]:
+            cursor[position] = change.id
+            change.cursor = self._format_cursor(cursor)
+            changes.append(change)
+
+        has_more = len(merged) > limit or any(len(rows) == limit for rows in shard_changes)
+        return changes, cursor, has_more
+
+    def _parse_cursor(self, value):
+        # The cursor holds the last change id seen on each shard, joined with dots
+        shard_count = len(get_shards())
+        if value == '0':
+            return [0] * shard_count
+        try:
+            cursor = [int(part) for part in value.split('.')]
+        except ValueError:
+            cursor = []
+        if len(cursor) != shard_count or any(part < 0 for part in cursor):
+            raise serializers.ValidationError({'since': 'Invalid cursor'})
+        return cursor
+
+    def _format_cursor(self, cursor):
+        return '.'.join(str(part) for part in cursor)
@@ -0,0 +1,39 @@
+from rest_framework.views import APIView
+from rest_framework import status
+from rest_framework.response import Response
+
+from orders.models import DeadLetterOrder
+from orders.serializers import DeadLetterOrderSerializer, OrderSerializer
+from orders.core.queue_manager import OrderQueue
+from orders.core.sharding import get_sharded_object_or_404, scatter
+
+class DeadLetterListView(APIView):
+    def get(self, request):
+        dead_letters = sorted(
+            (
+                dead_letter
+                for shard_dead_letters in scatter(
+                    lambda alias: list(DeadLetterOrder.objects.using(alias).select_related('order'))
+                )
+                for dead_letter in shard_dead_letters
+            ),
+            key=lambda dead_letter: dead_letter.dead_lettered_at
+        )
+        serializer = DeadLetterOrderSerializer(dead_letters, many=True)
+        return Response(serializer.data)
+
+class DeadLetterReplayView(APIView):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queue_manager = OrderQueue()
+        self.queue_manager.start_processing()
+
+    def post(self, request, order_id):
+        dead_letter = get_sharded_object_or_404(
+            DeadLetterOrder.objects.select_related('order'),
+            primary=True,
+            order__order_id=order_id
+        )
+        order = self.queue_manager.replay_dead_letter(dead_letter)
+        serializer = OrderSerializer(order)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
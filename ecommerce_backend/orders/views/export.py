@@ -0,0 +1,24 @@
+from django.http import StreamingHttpResponse
+from rest_framework.views import APIView
+
+from orders.serializers import OrderExportSerializer
+from orders.core.export import CONTENT_TYPES, iter_export, iter_gzip
+
+class OrderExportView(APIView):
+    def get(self, request):
+        serializer = OrderExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        export_format = params['export_format']
+        chunks = iter_export(params['start'], params['end'], export_format)
+        filename = f"orders.{export_format}"
+        content_type = CONTENT_TYPES[export_format]
+        if params['gzip']:
+            chunks = iter_gzip(chunks)
+            filename += '.gz'
+            content_type = 'application/gzip'
+
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -2,25 +2,55 @@ from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.response import Response
-from django.db.models import Avg, Count, F
+from django.db.models import Avg, Case, Count, F, FloatField, Func, IntegerField, When
+from django.db.models.functions import Cast, Floor, Ln
 from django.utils import timezone
 from datetime import timedelta
 
-from orders.models import Order, OrderStatus
-from orders.serializers import OrderSerializer
+from orders.models import DeadLetterOrder, Order, OrderStatus
+from orders.serializers import METRICS_WINDOWS, MetricsWindowSerializer, OrderSerializer
 from orders.core.queue_manager import OrderQueue
+from orders.core.rolling_metrics import LatencyHistogram
+from orders.core.sharding import scatter
+
+class DurationSeconds(Func):
+    """A duration expression, such as the difference of two datetimes, in seconds."""
+
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)::double precision'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite represents durations as integer microseconds
+        return self.as_sql(compiler, connection, template='(%(expressions)s / 1000000.0)', **extra_context)
 
 class OrderMetricsView(APIView):
     def get(self, request):
+        shard_metrics = scatter(self._get_shard_metrics)
+        total_processed = sum(shard['total_processed'] for shard in shard_metrics)
         metrics = {
-            'total_orders_processed': self._get_total_processed_orders().count(),
-            'status_counts': self._get_status_counts(),
-            'average_processing_time_seconds': self._get_average_processing_time()
+            'total_orders_processed': total_processed,
+            'status_counts': self._get_status_counts(shard_metrics),
+            'average_processing_time_seconds': self._get_average_processing_time(shard_metrics, total_processed),
+            'retry_stats': OrderQueue().get_stats(),
+            'pipeline': OrderQueue().pipeline.get_stats(),
+            'dead_letter_count': sum(shard['dead_letter_count'] for shard in shard_metrics)
         }
         return Response(metrics)
 
-    def _get_total_processed_orders(self):
-        completed_orders = Order.objects.filter(
+    def _get_shard_metrics(self, alias):
+        processed = self._get_total_processed_orders(alias).aggregate(
+            count=Count('id'),
+            avg_time=Avg(F('processing_completed_at') - F('processing_started_at'))
+        )
+        return {
+            'total_processed': processed['count'],
+            'average_processing_time': processed['avg_time'],
+            'status_counts': list(Order.objects.using(alias).values('status').annotate(count=Count('status'))),
+            'dead_letter_count': DeadLetterOrder.objects.using(alias).count()
+        }
+
+    def _get_total_processed_orders(self, alias):
+        completed_orders = Order.objects.using(alias).filter(
             status=OrderStatus.COMPLETED,
             processing_started_at__isnull=False,
             processing_completed_at__isnull=False
@@ -28,24 +58,98 @@ class OrderMetricsView(APIView):
         
         return completed_orders
 
-    def _get_status_counts(self):
+    def _get_status_counts(self, shard_metrics):
         status_count_dict = {status[0]: 0 for status in OrderStatus.choices}
-        # Remove select_for_update() to avoid the error
-        status_counts = Order.objects.values('status').annotate(count=Count('status'))
         
-        for item in status_counts:
-            status_count_dict[item['status']] = item['count']
+        for shard in shard_metrics:
+            for item in shard['status_counts']:
+                status_count_dict[item['status']] += item['count']
         
         return status_count_dict
 
-    def _get_average_processing_time(self):
-        completed_orders = self._get_total_processed_orders()       
-         
-        if not completed_orders.exists():
+    def _get_average_processing_time(self, shard_metrics, total_processed):
+        if not total_processed:
             return None
 
-        avg_processing_time = completed_orders.aggregate(
-            avg_time=Avg(F('processing_completed_at') - F('processing_started_at'))
-        )['avg_time']
+        # Weight each shard's average by the number of orders it covers
+        total_seconds = sum(
+            shard['average_processing_time'].total_seconds() * shard['total_processed']
+            for shard in shard_metrics
+            if shard['average_processing_time'] is not None
+        )
         
-        return avg_processing_time.total_seconds() if avg_processing_time else None
+        return total_seconds / total_processed
+
+class OrderWindowedMetricsView(APIView):
+    def get(self, request):
+        serializer = MetricsWindowSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        if 'start' in params:
+            start, end = params['start'], params['end']
+            window_seconds = covered_seconds = (end - start).total_seconds()
+            created, completed, processing, end_to_end = self._merge(
+                scatter(lambda alias: self._get_historical_metrics(alias, start, end))
+            )
+            source = 'database'
+        else:
+            window_seconds = METRICS_WINDOWS[params['window']]
+            created, completed, processing, end_to_end, covered_seconds = (
+                OrderQueue().rolling_metrics.snapshot(window_seconds)
+            )
+            source = 'memory'
+
+        minutes = covered_seconds / 60
+        metrics = {
+            'source': source,
+            'window_seconds': window_seconds,
+            'orders_created_per_minute': round(created / minutes, 3),
+            'orders_completed_per_minute': round(completed / minutes, 3),
+            'processing_time_seconds': processing.percentiles(),
+            'end_to_end_latency_seconds': end_to_end.percentiles()
+        }
+        return Response(metrics)
+
+    def _get_historical_metrics(self, alias, start, end):
+        # Both filters are range lookups on indexed columns, so only the requested slice is read
+        created = Order.objects.using(alias).filter(created_at__gte=start, created_at__lt=end).count()
+        completed_orders = Order.objects.using(alias).filter(
+            processing_completed_at__gte=start,
+            processing_completed_at__lt=end,
+            processing_started_at__isnull=False
+        ).annotate(
+            processing_seconds=DurationSeconds(F('processing_completed_at') - F('processing_started_at')),
+            end_to_end_seconds=DurationSeconds(F('processing_completed_at') - F('created_at'))
+        )
+
+        processing = self._get_histogram(completed_orders, 'processing_seconds')
+        end_to_end = self._get_histogram(completed_orders, 'end_to_end_seconds')
+        return created, processing.count, processing, end_to_end
+
+    def _get_histogram(self, queryset, seconds):
+        # The database groups rows into the histogram's buckets, so only one row per bucket comes back
+        histogram = LatencyHistogram()
+        bucket = Case(
+            When(**{f'{seconds}__gt': histogram.min_value}, then=Cast(
+                Floor(Ln(F(seconds) / histogram.min_value) / histogram.log_growth),
+                IntegerField()
+            )),
+            default=0,
+            output_field=IntegerField()
+        )
+        buckets = queryset.annotate(bucket=bucket).values('bucket').annotate(count=Count('id')).order_by()
+        for row in buckets:
+            histogram.record_bucket(row['bucket'], row['count'])
+        return histogram
+
+    def _merge(self, shard_metrics):
+        created = completed = 0
+        processing = LatencyHistogram()
+        end_to_end = LatencyHistogram()
+        for shard_created, shard_completed, shard_processing, shard_end_to_end in shard_metrics:
+            created += shard_created
+            completed += shard_completed
+            processing.merge(shard_processing)
+            end_to_end.merge(shard_end_to_end)
+        return created, completed, processing, end_to_end
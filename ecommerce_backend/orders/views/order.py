@@ -1,4 +1,3 @@
-from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.response import Response
@@ -9,6 +8,7 @@ from datetime import timedelta
 from orders.models import Order, OrderStatus
 from orders.serializers import OrderSerializer
 from orders.core.queue_manager import OrderQueue
+from orders.core.sharding import get_sharded_object_or_404, scatter
 
 # Create your views here.
 
@@ -20,11 +20,11 @@ class OrderView(APIView):
 
     def get(self, request, order_id=None):
         if order_id:
-            order = get_object_or_404(Order, order_id=order_id)
+            order = get_sharded_object_or_404(Order.objects.all(), order_id=order_id)
             serializer = OrderSerializer(order)
             return Response(serializer.data)
         
-        orders = Order.objects.all()
+        orders = [order for shard_orders in scatter(lambda alias: list(Order.objects.using(alias))) for order in shard_orders]
         serializer = OrderSerializer(orders, many=True)
         return Response(serializer.data)
 
@@ -33,4 +33,6 @@ class OrderView(APIView):
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
         self.queue_manager.add_order(order)
+        # Counted here rather than in add_order, which dead-letter replays also go through
+        self.queue_manager.rolling_metrics.record_created()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file